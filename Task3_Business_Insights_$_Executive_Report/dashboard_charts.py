@@ -0,0 +1,425 @@
+"""Data and figure builders behind dashboard_app.py, free of Streamlit.
+
+The dashboard calls these on every rerun; load_test.py calls the same
+functions from many threads to measure one server process under load.
+"""
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+import plotly.express as px
+
+from dashboard_queries import CITY_CANDIDATES, DATE_CANDIDATES, DELIVERY_CANDIDATES, pick_col
+from figure_cache import top_n_with_other
+
+
+# Colors & config
+PRIMARY = "#4f46e5"
+BAR_COLOR = PRIMARY
+PIE_PALETTE = px.colors.qualitative.Dark24
+
+GEO_FILE = "olist_geolocation_dataset.csv"     # optional raw Olist table: city coordinates for the customers map
+SUMMARY_FILES = {
+    "sales_month": "Olist_Sales_By_Month.csv",
+    "sales_state": "Olist_Sales_By_State.csv",
+    "sales_category": "Olist_Sales_By_Category.csv",
+    "customers_state": "Olist_Customers_By_State.csv",
+    "payment_methods": "Olist_Payment_Methods.csv",
+    "order_status": "Olist_Order_Status.csv",
+    "delivery_perf": "Olist_Delivery_Performance.csv",
+    "rfm_file": "Olist_RFM_Segments.csv",
+}
+
+# Small city coords (expand as needed)
+CITY_COORDS = {
+    "sao paulo": (-23.55052, -46.633308),
+    "rio de janeiro": (-22.906847, -43.172896),
+    "belo horizonte": (-19.920682, -43.937088),
+    "salvador": (-12.974722, -38.476389),
+    "curitiba": (-25.427778, -49.273056),
+    "recife": (-8.047562, -34.876964),
+    "porto alegre": (-30.034647, -51.217658),
+    "brasilia": (-15.793889, -47.882778),
+    "fortaleza": (-3.71722, -38.54306),
+    "manaus": (-3.10194, -60.025),
+    "belem": (-1.455833, -48.504444),
+    "goiania": (-16.686891, -49.264788),
+    "campinas": (-22.90556, -47.06083),
+    "niteroi": (-22.8833, -43.1033),
+    "joao pessoa": (-7.119495, -34.845011),
+    "maceio": (-9.66599, -35.735),
+    "florianopolis": (-27.5954, -48.5480),
+    "cuiaba": (-15.5989, -56.0949),
+    "vitoria": (-20.3155, -40.3128),
+}
+
+STATE_CENTROIDS = {
+    "AC": (-8.77, -70.55), "AL": (-9.62, -36.40), "AM": (-3.07, -61.66), "AP": (1.41, -51.77),
+    "BA": (-12.96, -38.51), "CE": (-5.20, -39.53), "DF": (-15.83, -47.86), "ES": (-19.19, -40.34),
+    "GO": (-15.42, -49.27), "MA": (-5.54, -45.27), "MG": (-18.10, -44.38), "MS": (-20.51, -54.54),
+    "MT": (-12.64, -55.42), "PA": (-5.53, -52.29), "PB": (-7.06, -35.55), "PE": (-8.28, -36.57),
+    "PI": (-7.71, -42.73), "PR": (-24.89, -51.55), "RJ": (-22.81, -42.99), "RN": (-5.22, -36.52),
+    "RO": (-11.22, -62.80), "RR": (1.89, -61.22), "RS": (-30.03, -51.23), "SC": (-27.33, -49.44),
+    "SE": (-10.57, -37.45), "SP": (-23.55, -46.63), "TO": (-10.25, -48.25)
+}
+
+
+# Loading
+
+def read_csv_if_exists(path: Path) -> Optional[pd.DataFrame]:
+    if not Path(path).exists():
+        return None
+    return pd.read_csv(path, low_memory=False)
+
+
+def read_summaries(data_dir: Path = Path(".")) -> dict:
+    # Pre-aggregated CSVs written by the pipeline (None where missing)
+    return {name: read_csv_if_exists(Path(data_dir) / fn) for name, fn in SUMMARY_FILES.items()}
+
+
+def read_city_coords(data_dir: Path = Path(".")) -> dict:
+    # City centroids from the Olist geolocation table (thousands of cities) when it is in the folder,
+    # else the small hand-made CITY_COORDS table
+    p = Path(data_dir) / GEO_FILE
+    if not p.exists():
+        return CITY_COORDS
+    geo = pd.read_csv(p, usecols=["geolocation_city", "geolocation_lat", "geolocation_lng"])
+    geo["city_key"] = (geo["geolocation_city"].astype(str).str.strip().str.lower()
+                       .str.normalize("NFKD").str.encode("ascii", errors="ignore").str.decode("ascii"))
+    centroids = geo.groupby("city_key")[["geolocation_lat", "geolocation_lng"]].median()
+    coords = dict(zip(centroids.index, zip(centroids["geolocation_lat"], centroids["geolocation_lng"])))
+    return {**coords, **CITY_COORDS}
+
+
+class ChartData:
+    """What the builders read: the query backend, its detected columns and the summary CSVs.
+
+    city_coords is called only when the city map is built, so the dashboard
+    can pass its cached loader.
+    """
+
+    def __init__(self, queries, summaries: dict, city_coords: Callable[[], dict]):
+        self.queries = queries
+        self.summaries = summaries
+        self.city_coords = city_coords
+        # Robust column detection in master
+        self.columns = queries.columns if queries is not None else []
+        self.pay_col = pick_col(queries, ["payment_value", "payment_amount", "price", "payment"])
+        self.state_col = pick_col(queries, ["customer_state", "state", "customer_state_code"])
+        self.city_col = pick_col(queries, CITY_CANDIDATES)
+        self.date_col = pick_col(queries, DATE_CANDIDATES)
+        self.customer_col = pick_col(queries, ["customer_unique_id", "customer_id"])
+        self.order_col = pick_col(queries, ["order_id"])
+        self.category_col = pick_col(queries, ["product_category_name_english", "product_category_name", "product_category", "category"])
+        self.delivery_col = pick_col(queries, DELIVERY_CANDIDATES)
+        self.seller_col = pick_col(queries, ["seller_id"])
+        self.review_col = pick_col(queries, ["review_score"])
+
+
+# Filters
+
+def filter_options(data: ChartData) -> dict:
+    # Choices of the sidebar selectboxes
+    queries, summaries = data.queries, data.summaries
+    years = ["All"]
+    if "year" in data.columns:
+        years += sorted(int(y) for y in queries.distinct("year"))
+
+    states = ["All"]
+    customers_state = summaries["customers_state"]
+    if customers_state is not None and "customer_state" in customers_state.columns:
+        states += sorted(customers_state["customer_state"].dropna().unique().tolist())
+    elif data.state_col:
+        states += sorted(queries.distinct(data.state_col))
+
+    prodcats = ["All"]
+    sales_category = summaries["sales_category"]
+    if sales_category is not None:
+        pcol = pick_col(sales_category, ["product_category_name_english", "Category", "product_category_name"])
+        if pcol:
+            prodcats += sorted(list(sales_category[pcol].dropna().unique()))
+    elif data.category_col:
+        prodcats += sorted(queries.distinct(data.category_col))
+    return {"Year": years, "State": states, "Product Category": prodcats}
+
+
+def make_filters(data: ChartData, year="All", state="All", product="All", seller: str = "",
+                 city: str = "", zip_prefix: str = "", reviews=()) -> tuple:
+    # Filters as (column, op, value) tuples; the query backend turns them into a mask or a SQL WHERE
+    filters = []
+    if year != "All" and "year" in data.columns:
+        filters.append(("year", "==", int(year)))
+    if state != "All" and data.state_col:
+        filters.append((data.state_col, "==", state))
+    if product != "All" and data.category_col:
+        filters.append((data.category_col, "==", product))
+    if seller and data.seller_col:
+        filters.append((data.seller_col, "==", seller))
+    if city and "city_key" in data.columns:
+        filters.append(("city_key", "==", city))
+    if zip_prefix and "zip_prefix" in data.columns:
+        filters.append(("zip_prefix", "startswith", zip_prefix))
+    if reviews and data.review_col:
+        filters.append((data.review_col, "in", tuple(sorted(reviews))))
+    return tuple(filters)
+
+
+def aggregate(data: ChartData, filters: tuple, by=None, aggs=None, dropna: bool = True) -> Optional[pd.DataFrame]:
+    if data.queries is None:
+        return None
+    return data.queries.aggregate(filters, by=by, aggs=aggs, dropna=dropna)
+
+
+def kpi_row(data: ChartData, filters: tuple) -> dict:
+    # Page 1 KPI row: sales, orders and customers under the filters; delivery success over all orders
+    kpi_aggs = {}
+    if data.pay_col:
+        kpi_aggs["total_sales"] = (data.pay_col, "sum")
+    if data.order_col:
+        kpi_aggs["total_orders"] = (data.order_col, "nunique")
+    if data.customer_col:
+        kpi_aggs["unique_customers"] = (data.customer_col, "nunique")
+    kpis = aggregate(data, filters, aggs=kpi_aggs).iloc[0] if kpi_aggs else {}
+    total_sales = kpis.get("total_sales")
+    total_orders = kpis.get("total_orders")
+
+    delivery_success = None
+    if "is_delivered_to_customer" in data.columns:
+        try:
+            delivery_success = aggregate(data, (), aggs={"rate": ("is_delivered_to_customer", "mean")})["rate"].iloc[0] * 100
+        except Exception:
+            delivery_success = None
+    return {
+        "total_sales": total_sales,
+        "total_orders": total_orders,
+        "unique_customers": kpis.get("unique_customers"),
+        "aov": (total_sales / total_orders) if total_sales and total_orders else None,
+        "delivery_success": delivery_success,
+    }
+
+
+# Figure builders: (data, filters) -> figure, or None when the data is not available
+
+def set_transparent(fig):
+    fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+def build_state_map(data: ChartData, filters: tuple):
+    sales_state = data.summaries["sales_state"]
+    s_df = None
+    if data.state_col and data.pay_col:
+        s_df = aggregate(data, filters, by=data.state_col, aggs={"Sales": (data.pay_col, "sum")}).rename(columns={data.state_col: "State"})
+    elif sales_state is not None:
+        s_df = sales_state.copy()
+        if len(s_df.columns) >= 2:
+            s_df.columns = ["State", "Sales"]
+    if s_df is None or s_df.empty:
+        return None
+    s_df["code"] = s_df["State"].astype(str).str.upper().str.strip()
+    s_df["lat"] = s_df["code"].apply(lambda c: STATE_CENTROIDS.get(c, (None, None))[0])
+    s_df["lon"] = s_df["code"].apply(lambda c: STATE_CENTROIDS.get(c, (None, None))[1])
+    s_map = s_df.dropna(subset=["lat", "lon"]).copy()
+    if not s_map.empty:
+        s_map["size"] = (s_map["Sales"] / (s_map["Sales"].max() + 1)) * 60 + 6
+        fig = px.scatter_map(
+            s_map, lat="lat", lon="lon", size="size", hover_name="State",
+            hover_data={"Sales": ":,.0f"}, color_discrete_sequence=[BAR_COLOR],
+            zoom=3.2, center={"lat": -14.2, "lon": -51.9}, map_style="carto-darkmatter"
+        )
+    else:
+        tmp = s_df.sort_values("Sales", ascending=False).head(20)
+        fig = px.bar(tmp, x="Sales", y="State", orientation="h", template="plotly_dark", color_discrete_sequence=[BAR_COLOR])
+    return set_transparent(fig)
+
+
+def build_city_map(data: ChartData, filters: tuple):
+    if data.city_col is None:
+        return None
+    if data.customer_col:
+        city_counts = aggregate(data, filters, by="city_key", aggs={"Customers": (data.customer_col, "nunique")})
+    else:
+        city_counts = aggregate(data, filters, by="city_key", aggs={"Customers": ("city_key", "size")})
+
+    city_coords = data.city_coords()
+    city_counts["lat"] = city_counts["city_key"].map(lambda x: city_coords.get(x, (None, None))[0])
+    city_counts["lon"] = city_counts["city_key"].map(lambda x: city_coords.get(x, (None, None))[1])
+    city_map = city_counts.dropna(subset=["lat", "lon"]).copy()
+    if not city_map.empty:
+        # thousands of cities -> top-N points plus one "other" bucket
+        city_map = top_n_with_other(city_map, "Customers", "city_key")
+        city_map["size"] = (city_map["Customers"] / (city_map["Customers"].max() + 1)) * 60 + 6
+        fig = px.scatter_map(
+            city_map, lat="lat", lon="lon", size="size", hover_name="city_key",
+            hover_data={"Customers": True}, color_discrete_sequence=[BAR_COLOR],
+            zoom=3.2, center={"lat": -14.2, "lon": -51.9}, map_style="carto-darkmatter"
+        )
+        return set_transparent(fig)
+    top_cities = city_counts.sort_values("Customers", ascending=False).head(20)
+    if top_cities.empty:
+        return None
+    fig = px.bar(top_cities, x="Customers", y="city_key", orientation="h", template="plotly_dark", color_discrete_sequence=[BAR_COLOR])
+    return set_transparent(fig)
+
+
+def build_monthly(data: ChartData, filters: tuple):
+    if "month_num" not in data.columns or not data.pay_col:
+        return None
+    monthly = aggregate(data, filters, by="month_num", aggs={"Sales": (data.pay_col, "sum")}).set_index("month_num")["Sales"]
+    monthly = monthly.reindex(range(1, 13), fill_value=0).rename_axis("Month").reset_index()
+    monthly["MonthName"] = monthly["Month"].apply(lambda m: pd.Timestamp(2000, m, 1).strftime("%b"))
+    fig = px.line(monthly, x="MonthName", y="Sales", markers=True, template="plotly_dark")
+    fig.update_traces(line=dict(color=BAR_COLOR))
+    return set_transparent(fig)
+
+
+def build_yearly(data: ChartData, filters: tuple):
+    if "year" not in data.columns or not data.pay_col:
+        return None
+    yearly = aggregate(data, filters, by="year", aggs={"Sales": (data.pay_col, "sum")})
+    fig = px.line(yearly.sort_values("year"), x="year", y="Sales", markers=True, template="plotly_dark")
+    fig.update_traces(line=dict(color=BAR_COLOR))
+    return set_transparent(fig)
+
+
+def build_top_categories(data: ChartData, filters: tuple):
+    # ignores the filters
+    sales_category = data.summaries["sales_category"]
+    if sales_category is not None:
+        prod_col = pick_col(sales_category, ["product_category_name_english", "product_category_name", "Category"])
+        val_col = pick_col(sales_category, ["payment_value", "Sales", "payment"])
+        if prod_col and val_col:
+            tmp = sales_category.groupby(prod_col)[val_col].sum().reset_index().sort_values(val_col, ascending=False).head(10)
+            fig = px.bar(tmp, x=val_col, y=prod_col, orientation="h", template="plotly_dark", color_discrete_sequence=[BAR_COLOR])
+            return set_transparent(fig)
+    if data.category_col and data.pay_col:
+        tmp = aggregate(data, (), by=data.category_col, aggs={"Sales": (data.pay_col, "sum")}).sort_values("Sales", ascending=False).head(10)
+        tmp = tmp.rename(columns={data.category_col: "Category"})
+        fig = px.bar(tmp, x="Sales", y="Category", orientation="h", template="plotly_dark", color_discrete_sequence=[BAR_COLOR])
+        return set_transparent(fig)
+    return None
+
+
+def build_payment_methods(data: ChartData, filters: tuple):
+    payment_methods = data.summaries["payment_methods"]
+    if payment_methods is not None and len(payment_methods.columns) >= 2:
+        pm_cat = payment_methods.columns[0]
+        pm_val = payment_methods.columns[1]
+        pm_df = payment_methods.copy()
+        pm_df[pm_cat] = pm_df[pm_cat].fillna("Not defined")
+        pm_agg = pm_df.groupby(pm_cat)[pm_val].sum().reset_index().sort_values(pm_val, ascending=False)
+        fig = px.pie(pm_agg, names=pm_cat, values=pm_val, hole=0.35, color_discrete_sequence=PIE_PALETTE)
+    else:
+        pay_col = pick_col(data.queries, ["payment_type", "payment_method", "payment"])
+        if not pay_col:
+            return None
+        tmp = aggregate(data, filters, by=pay_col, aggs={"count": (pay_col, "size")}, dropna=False).rename(columns={pay_col: "method"})
+        tmp["method"] = tmp["method"].fillna("Not defined")
+        tmp = tmp.sort_values("count", ascending=False)
+        fig = px.pie(tmp, names="method", values="count", hole=0.35, color_discrete_sequence=PIE_PALETTE)
+    fig = set_transparent(fig)
+    fig.update_traces(textinfo='percent+label')
+    return fig
+
+
+def rfm_label(s):
+    s = str(s)
+    if s.startswith(("44", "43")): return "Champions"
+    if s.startswith(("34", "33")): return "Loyal"
+    if s.startswith(("24", "23")): return "Potential"
+    return "At Risk"
+
+
+def build_rfm(data: ChartData, filters: tuple):
+    # ignores the filters
+    rfm_file = data.summaries["rfm_file"]
+    if rfm_file is not None:
+        seg_col = pick_col(rfm_file, ["segment", "Segment", "rfm_segment"])
+        val_col = pick_col(rfm_file, ["count", "customers", "value"])
+        if seg_col and val_col:
+            rf_agg = rfm_file.groupby(seg_col)[val_col].sum().reset_index().sort_values(val_col, ascending=False)
+            rf_agg.columns = ["Segment", "Count"]
+            fig = px.pie(rf_agg, names="Segment", values="Count", hole=0.35, color_discrete_sequence=PIE_PALETTE)
+            fig = set_transparent(fig)
+            fig.update_traces(textinfo='percent+label')
+            return fig
+    # fallback compute approximate RFM if possible
+    if not data.customer_col or not data.order_col or not data.date_col:
+        return None
+    try:
+        # compute recency, frequency, monetary (one row per customer comes back from the backend)
+        rfm_aggs = {"last_order": (data.date_col, "max"), "Frequency": (data.order_col, "count")}
+        if data.pay_col:
+            rfm_aggs["Monetary"] = (data.pay_col, "sum")
+        rfm_df = aggregate(data, (), by=data.customer_col, aggs=rfm_aggs)
+        last_orders = pd.to_datetime(rfm_df["last_order"])
+        rfm_df["Recency"] = (last_orders.max() - last_orders).dt.days
+        if "Monetary" not in rfm_df.columns:
+            rfm_df["Monetary"] = 0
+        # create quartiles
+        rfm_df["R_score"] = pd.qcut(rfm_df["Recency"].rank(method='first'), 4, labels=[4, 3, 2, 1])
+        rfm_df["F_score"] = pd.qcut(rfm_df["Frequency"].rank(method='first'), 4, labels=[1, 2, 3, 4])
+        rfm_df["M_score"] = pd.qcut(rfm_df["Monetary"].rank(method='first'), 4, labels=[1, 2, 3, 4])
+        rfm_df["RFM_Score"] = rfm_df["R_score"].astype(str) + rfm_df["F_score"].astype(str) + rfm_df["M_score"].astype(str)
+        rfm_df["Segment"] = rfm_df["RFM_Score"].apply(rfm_label)
+        seg_counts = rfm_df["Segment"].value_counts().reset_index()
+        seg_counts.columns = ["Segment", "Count"]
+        fig = px.pie(seg_counts, names="Segment", values="Count", hole=0.35, color_discrete_sequence=PIE_PALETTE)
+        fig = set_transparent(fig)
+        fig.update_traces(textinfo='percent+label')
+        return fig
+    except Exception:
+        return None
+
+
+def build_delivery(data: ChartData, filters: tuple):
+    delivery_perf = data.summaries["delivery_perf"]
+    if delivery_perf is not None and "customer_state" in delivery_perf.columns and "avg_delivery_days" in delivery_perf.columns:
+        dp = delivery_perf.sort_values("avg_delivery_days", ascending=False).head(10)
+        fig = px.bar(dp, x="avg_delivery_days", y="customer_state", orientation="h", template="plotly_dark", color_discrete_sequence=[BAR_COLOR])
+        return set_transparent(fig)
+    dcol = data.delivery_col
+    if not dcol or not data.state_col:
+        return None
+    tmp = aggregate(data, filters, by=data.state_col, aggs={"avg_delivery_days": (dcol, "mean")}).rename(columns={data.state_col: "customer_state"}).sort_values("avg_delivery_days", ascending=False).head(10)
+    fig = px.bar(tmp, x="avg_delivery_days", y="customer_state", orientation="h", template="plotly_dark", color_discrete_sequence=[BAR_COLOR])
+    return set_transparent(fig)
+
+
+def build_order_status(data: ChartData, filters: tuple):
+    # ignores the filters; prefer external order_status file else master
+    order_status = data.summaries["order_status"]
+    if order_status is not None and len(order_status.columns) >= 2:
+        cat = order_status.columns[0]; val = order_status.columns[1]
+        os_df = order_status.groupby(cat)[val].sum().reset_index().sort_values(val, ascending=False)
+        os_df = os_df.rename(columns={cat: "order_status", val: "count"})
+        fig = px.bar(os_df, x="count", y="order_status", orientation="h", template="plotly_dark", color_discrete_sequence=[BAR_COLOR])
+        return set_transparent(fig)
+    status_col = pick_col(data.queries, ["order_status", "status"])
+    if not status_col:
+        return None
+    tmp = aggregate(data, (), by=status_col, aggs={"count": (status_col, "size")}, dropna=False)
+    tmp.columns = ["order_status", "count"]
+    tmp["order_status"] = tmp["order_status"].fillna("Unknown")
+    tmp = tmp.sort_values("count", ascending=False)
+    fig = px.bar(tmp, x="count", y="order_status", orientation="h", template="plotly_dark", color_discrete_sequence=[BAR_COLOR])
+    return set_transparent(fig)
+
+
+# Every chart the dashboard draws on a rerun: name -> (builder, uses the sidebar filters)
+CHARTS = {
+    "sales_by_state": (build_state_map, True),
+    "customers_by_city": (build_city_map, True),
+    "monthly_trend": (build_monthly, True),
+    "yearly_trend": (build_yearly, True),
+    "top_categories": (build_top_categories, False),
+    "payment_methods": (build_payment_methods, True),
+    "rfm_segments": (build_rfm, False),
+    "delivery_performance": (build_delivery, True),
+    "order_status": (build_order_status, False),
+}
+
+
+def chart_key(chart: str, filters: tuple, version: tuple) -> tuple:
+    # Figure cache key: unfiltered charts share one entry per data version
+    return (chart, filters if CHARTS[chart][1] else (), version)
@@ -0,0 +1,304 @@
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:     # optional: falls back to pandas over the CSV master
+    duckdb = None
+
+
+# Master dataset written by Olist_data.py
+MASTER_FILE = "Olist_Cleaned_Full_Dataset.csv"     # Unable to upload on GitHub due to the size but can be accessed through the link in the requirements file.
+MASTER_PARQUET = "Olist_Cleaned_Full_Dataset.parquet"     # queried with DuckDB when installed
+
+DATE_CANDIDATES = ["order_purchase_timestamp", "order_date", "purchase_date"]
+CITY_CANDIDATES = ["customer_city", "city"]
+ZIP_CANDIDATES = ["customer_zip_code_prefix", "zip_code_prefix"]
+DELIVERY_CANDIDATES = ["delivery_time", "delivery_time_days", "delivery_time_day"]
+
+# DuckDB config (spills to disk above the memory limit)
+DUCKDB_MEMORY_LIMIT = "2GB"
+DUCKDB_TEMP_DIR = ".duckdb_tmp"
+
+# Filters are tuples of (column, op, value) so they can be used directly as cache keys:
+#   ("customer_state", "==", "SP"), ("review_score", "in", (1, 2)), ("zip_prefix", "startswith", "010")
+FILTER_OPS = ("==", "in", "startswith")
+
+# Aggregations accepted by aggregate(): {output name: (column, func)}
+AGG_FUNCS = {
+    "sum": "COALESCE(SUM({}), 0)",      # 0 for an empty selection, as in pandas
+    "mean": "AVG(CAST({} AS DOUBLE))",
+    "count": "COUNT({})",
+    "nunique": "COUNT(DISTINCT {})",
+    "max": "MAX({})",
+    "min": "MIN({})",
+    "size": "COUNT(*)",
+}
+
+
+def pick_col(df, candidates: list) -> Optional[str]:
+    # df may be a DataFrame, a query backend or a plain list of column names
+    if df is None: return None
+    cols = list(getattr(df, "columns", df))
+    lower = {c.lower(): c for c in cols}
+    for cand in candidates:
+        if cand is None: continue
+        if cand.lower() in lower:
+            return lower[cand.lower()]
+    # contains fallback
+    for cand in candidates:
+        if cand is None: continue
+        for c in cols:
+            if cand.lower() in c.lower():
+                return c
+    return None
+
+
+def parquet_columns(path: Path) -> list:
+    sql = f"DESCRIBE SELECT * FROM read_parquet('{Path(path).as_posix()}')"
+    return [r[0] for r in duckdb.sql(sql).fetchall()]
+
+
+def _check(filters: tuple, aggs: dict) -> None:
+    for _, op, _ in filters:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter op: {op!r}")
+    for _, func in aggs.values():
+        if func not in AGG_FUNCS:
+            raise ValueError(f"Unsupported aggregation: {func!r}")
+
+
+def read_master(path: Path) -> Optional[pd.DataFrame]:
+    # CSV master with dates parsed and derived fields added
+    if not Path(path).exists():
+        return None
+    master = pd.read_csv(path, low_memory=False)
+    date_col = pick_col(master, DATE_CANDIDATES)
+
+    # normalize master dates & derived fields if available
+    if date_col and date_col in master.columns:
+        master[date_col] = pd.to_datetime(master[date_col], errors="coerce")
+        master["year"] = master[date_col].dt.year
+        master["month_num"] = master[date_col].dt.month
+        master["month_name"] = master[date_col].dt.strftime("%b")
+        master["month_label"] = master[date_col].dt.strftime("%b %Y")
+
+    # If delivery_time missing but delivered / purchase timestamps exist, compute
+    if pick_col(master, DELIVERY_CANDIDATES) is None:
+        if "order_delivered_customer_date" in master.columns and date_col in master.columns:
+            master["order_delivered_customer_date"] = pd.to_datetime(master["order_delivered_customer_date"], errors="coerce")
+            master["delivery_time_days"] = (master["order_delivered_customer_date"] - master[date_col]).dt.days
+    return master
+
+
+def open_queries(data_dir: Path = Path(".")):
+    # Prefer SQL over the Parquet export (nothing pulled into pandas); else pandas over the CSV master
+    parquet = Path(data_dir) / MASTER_PARQUET
+    if duckdb is not None and parquet.exists():
+        cols = parquet_columns(parquet)
+        return DuckDBQueries(parquet, pick_col(cols, DATE_CANDIDATES), pick_col(cols, CITY_CANDIDATES), pick_col(cols, ZIP_CANDIDATES))
+    master = read_master(Path(data_dir) / MASTER_FILE)
+    if master is None:
+        return None
+    return FrameQueries(master, pick_col(master, DATE_CANDIDATES), pick_col(master, CITY_CANDIDATES), pick_col(master, ZIP_CANDIDATES))
+
+
+# KPIs (shared by the dashboard and the batch reports)
+
+def fmt_k(n):
+    try:
+        n = float(n)
+    except Exception:
+        return "N/A"
+    if n != n:
+        return "N/A"
+    if abs(n) >= 1_000_000:
+        return f"{n/1_000_000:.1f}M"
+    if abs(n) >= 1_000:
+        return f"{n/1_000:.1f}K"
+    return f"{n:,.0f}"
+
+
+def fmt_kpi(name: str, value) -> str:
+    if value is None or value != value:
+        return "N/A"
+    if name == "total_sales" or name == "aov":
+        return "$" + fmt_k(value)
+    if name == "delivery_success":
+        return f"{value:.1f}%"
+    if name == "avg_delivery_days":
+        return f"{value:.1f}"
+    return fmt_k(value)
+
+
+def report_columns(queries) -> dict:
+    # same column detection as the dashboard
+    return {
+        "sales": pick_col(queries, ["payment_value", "payment_amount", "price", "payment"]),
+        "state": pick_col(queries, ["customer_state", "state", "customer_state_code"]),
+        "category": pick_col(queries, ["product_category_name_english", "product_category_name", "product_category", "category"]),
+        "order": pick_col(queries, ["order_id"]),
+        "customer": pick_col(queries, ["customer_unique_id", "customer_id"]),
+        "date": pick_col(queries, DATE_CANDIDATES),
+        "delivery": pick_col(queries, DELIVERY_CANDIDATES),
+        "delivered": "is_delivered_to_customer" if "is_delivered_to_customer" in queries.columns else None,
+    }
+
+
+def kpi_aggs(cols: dict) -> dict:
+    aggs = {}
+    if cols["sales"]:
+        aggs["total_sales"] = (cols["sales"], "sum")
+    if cols["order"]:
+        aggs["total_orders"] = (cols["order"], "nunique")
+    if cols["customer"]:
+        aggs["unique_customers"] = (cols["customer"], "nunique")
+    if cols["delivered"]:
+        aggs["delivery_success"] = (cols["delivered"], "mean")
+    if cols["delivery"]:
+        aggs["avg_delivery_days"] = (cols["delivery"], "mean")
+    return aggs
+
+
+def segment_kpis(queries, cols: dict, by: Optional[str] = None) -> pd.DataFrame:
+    """KPIs for every value of `by` in one aggregation (one row for the whole dataset if by is None)."""
+    kpis = queries.aggregate(by=by, aggs=kpi_aggs(cols))
+    if "total_sales" in kpis and "total_orders" in kpis:
+        kpis["aov"] = kpis["total_sales"] / kpis["total_orders"].where(kpis["total_orders"] > 0)
+    if "delivery_success" in kpis:
+        kpis["delivery_success"] = kpis["delivery_success"] * 100
+    return kpis
+
+
+def overall_kpis(queries, cols: Optional[dict] = None) -> dict:
+    kpis = segment_kpis(queries, cols or report_columns(queries))
+    return {k: (None if pd.isna(v) else float(v)) for k, v in kpis.iloc[0].items()}
+
+
+# Pandas backend (master frame already in memory)
+
+class FrameQueries:
+    """Filter/aggregate queries over an in-memory master frame."""
+
+    backend = "pandas"
+
+    def __init__(self, df: pd.DataFrame, date_col: Optional[str], city_col: Optional[str],
+                 zip_col: Optional[str] = None):
+        # derived columns shared with the SQL backend
+        if date_col and "year" not in df.columns:
+            df["year"] = df[date_col].dt.year
+            df["month_num"] = df[date_col].dt.month
+        if city_col and "city_key" not in df.columns:
+            df["city_key"] = df[city_col].astype(str).str.strip().str.lower()
+        if zip_col and "zip_prefix" not in df.columns:
+            df["zip_prefix"] = pd.to_numeric(df[zip_col], errors="coerce").astype("Int64").astype(str).str.zfill(5)
+        self.df = df
+        self.columns = list(df.columns)
+
+    def where(self, filters: tuple = ()) -> pd.DataFrame:
+        if not filters:
+            return self.df
+        mask = pd.Series(True, index=self.df.index)
+        for col, op, value in filters:
+            if op == "==":
+                mask &= self.df[col] == value
+            elif op == "in":
+                mask &= self.df[col].isin(value)
+            else:
+                mask &= self.df[col].astype(str).str.startswith(str(value))
+        return self.df[mask]
+
+    def aggregate(self, filters: tuple = (), by=None, aggs: Optional[dict] = None, dropna: bool = True) -> pd.DataFrame:
+        aggs = aggs or {}
+        _check(filters, aggs)
+        src = self.where(filters)
+        if by is None:
+            row = {}
+            for name, (col, func) in aggs.items():
+                row[name] = len(src) if func == "size" else src[col].agg(func)
+            return pd.DataFrame([row])
+        by = [by] if isinstance(by, str) else list(by)
+        named = {name: (by[0] if func == "size" else col, func) for name, (col, func) in aggs.items()}
+        return src.groupby(by, dropna=dropna).agg(**named).reset_index()
+
+    def distinct(self, col: str) -> list:
+        return self.df[col].dropna().unique().tolist()
+
+    def close(self) -> None:
+        pass    # nothing to release beyond the frame itself
+
+
+# DuckDB backend (queries pushed down to the Parquet export)
+
+def _ident(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+class DuckDBQueries:
+    """Same queries as FrameQueries, run as SQL over the Parquet master.
+
+    Only the filtered rows and referenced columns are read from disk, the
+    aggregation runs multi-threaded inside DuckDB and only the (small)
+    aggregated result is converted to pandas.
+    """
+
+    backend = "duckdb"
+
+    def __init__(self, parquet_path: Path, date_col: Optional[str], city_col: Optional[str],
+                 zip_col: Optional[str] = None):
+        self.con = duckdb.connect(config={"memory_limit": DUCKDB_MEMORY_LIMIT, "temp_directory": DUCKDB_TEMP_DIR})
+        source = f"read_parquet('{Path(parquet_path).as_posix()}')"
+        raw_cols = parquet_columns(parquet_path)
+        derived = []
+        if date_col in raw_cols and "year" not in raw_cols:
+            ts = f"CAST({_ident(date_col)} AS TIMESTAMP)"
+            derived += [f"year({ts}) AS year", f"month({ts}) AS month_num"]
+        if city_col in raw_cols and "city_key" not in raw_cols:
+            derived.append(f"lower(trim(CAST({_ident(city_col)} AS VARCHAR))) AS city_key")
+        if zip_col in raw_cols and "zip_prefix" not in raw_cols:
+            derived.append(f"lpad(CAST({_ident(zip_col)} AS VARCHAR), 5, '0') AS zip_prefix")
+        self.con.execute(f"CREATE VIEW master AS SELECT *{''.join(', ' + d for d in derived)} FROM {source}")
+        self.columns = [r[0] for r in self.con.execute("DESCRIBE master").fetchall()]
+
+    def _where(self, filters: tuple):
+        clauses, params = [], []
+        for col, op, value in filters:
+            if op == "==":
+                clauses.append(f"{_ident(col)} = ?")
+                params.append(value)
+            elif op == "in":
+                clauses.append(f"{_ident(col)} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            else:
+                clauses.append(f"starts_with(CAST({_ident(col)} AS VARCHAR), ?)")
+                params.append(str(value))
+        return clauses, params
+
+    def aggregate(self, filters: tuple = (), by=None, aggs: Optional[dict] = None, dropna: bool = True) -> pd.DataFrame:
+        aggs = aggs or {}
+        _check(filters, aggs)
+        by = [] if by is None else ([by] if isinstance(by, str) else list(by))
+        clauses, params = self._where(filters)
+        if dropna:
+            clauses += [f"{_ident(c)} IS NOT NULL" for c in by]
+        select = [_ident(c) for c in by] + [
+            f"{AGG_FUNCS[func].format(_ident(col))} AS {_ident(name)}" for name, (col, func) in aggs.items()
+        ]
+        sql = f"SELECT {', '.join(select)} FROM master"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if by:
+            # sorted like pandas' groupby so both backends return identical frames
+            keys = ", ".join(_ident(c) for c in by)
+            sql += f" GROUP BY {keys} ORDER BY {keys}"
+        # one cursor per query: Streamlit sessions run in separate threads
+        return self.con.cursor().execute(sql, params).df()
+
+    def distinct(self, col: str) -> list:
+        sql = f"SELECT DISTINCT {_ident(col)} FROM master WHERE {_ident(col)} IS NOT NULL"
+        return [r[0] for r in self.con.cursor().execute(sql).fetchall()]
+
+    def close(self) -> None:
+        self.con.close()
@@ -0,0 +1,235 @@
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Checks for the raw Olist tables (keyed by file stem, as returned by the load stage)
+ORDERS = "olist_orders_dataset"
+CUSTOMERS = "olist_customers_dataset"
+ITEMS = "olist_order_items_dataset"
+PAYMENTS = "olist_order_payments_dataset"
+REVIEWS = "olist_order_reviews_dataset"
+PRODUCTS = "olist_products_dataset"
+SELLERS = "olist_sellers_dataset"
+TRANSLATION = "product_category_name_translation"
+
+# Expected grain (unique key) of each table
+GRAINS = {
+    ORDERS: ["order_id"],
+    CUSTOMERS: ["customer_id"],
+    ITEMS: ["order_id", "order_item_id"],
+    PAYMENTS: ["order_id", "payment_sequential"],
+    REVIEWS: ["review_id", "order_id"],
+    PRODUCTS: ["product_id"],
+    SELLERS: ["seller_id"],
+    TRANSLATION: ["product_category_name"],
+}
+
+# (table, column) keys that must exist in (table, column); one entry per inner join in the pipeline,
+# in both directions where rows on either side are silently dropped
+RELATIONSHIPS = [
+    (ORDERS, "customer_id", CUSTOMERS, "customer_id"),
+    (ORDERS, "order_id", ITEMS, "order_id"),
+    (ITEMS, "order_id", ORDERS, "order_id"),
+    (ORDERS, "order_id", PAYMENTS, "order_id"),
+    (PAYMENTS, "order_id", ORDERS, "order_id"),
+    (ORDERS, "order_id", REVIEWS, "order_id"),
+    (REVIEWS, "order_id", ORDERS, "order_id"),
+    (ITEMS, "product_id", PRODUCTS, "product_id"),
+    (ITEMS, "seller_id", SELLERS, "seller_id"),
+    (PRODUCTS, "product_category_name", TRANSLATION, "product_category_name"),
+]
+
+# Child tables joined per order: more than one row per order multiplies the merged rows
+FANOUT = [(ITEMS, "order_id"), (PAYMENTS, "order_id"), (REVIEWS, "order_id")]
+
+# (table, later timestamp, earlier timestamp, check name)
+DATE_ORDER = [
+    (ORDERS, "order_approved_at", "order_purchase_timestamp", "approved_before_purchase"),
+    (ORDERS, "order_delivered_carrier_date", "order_purchase_timestamp", "carrier_before_purchase"),
+    (ORDERS, "order_delivered_customer_date", "order_purchase_timestamp", "delivered_before_purchase"),
+    (ORDERS, "order_delivered_customer_date", "order_delivered_carrier_date", "delivered_before_carrier"),
+]
+
+N_EXAMPLES = 5
+
+
+class KeyIndex:
+    """Integer codes for the key columns, hashed once per key column name.
+
+    The pipeline joins on same-named columns, so every column called e.g.
+    order_id is factorized together: equal keys get equal codes in every
+    table, and the anti-joins, fan-out counts and grain checks below are
+    integer lookups, not string hashes.
+    """
+
+    def __init__(self, tables: dict, relationships: list, grains: Optional[dict] = None):
+        self._codes = {}
+        self._present = {}
+        self.n_keys = {}
+        domains = {}
+        for child, child_col, parent, parent_col in relationships:
+            domains.setdefault(child_col, set()).add((child, child_col))
+            domains.setdefault(parent_col, set()).add((parent, parent_col))
+        for table, grain in (grains or {}).items():
+            for col in grain:
+                domains.setdefault(col, set()).add((table, col))
+        for name, members in domains.items():
+            members = sorted(members)
+            codes, uniques = pd.factorize(pd.concat([tables[t][c] for t, c in members], ignore_index=True))
+            self.n_keys[name] = len(uniques)
+            bounds = np.cumsum([0] + [len(tables[t]) for t, _ in members])
+            for (t, c), lo, hi in zip(members, bounds[:-1], bounds[1:]):
+                self._codes[(t, c)] = codes[lo:hi]
+
+    def has(self, table: str, col: str) -> bool:
+        return (table, col) in self._codes
+
+    def codes(self, table: str, col: str) -> np.ndarray:
+        return self._codes[(table, col)]      # -1 marks a null key
+
+    def row_keys(self, table: str, cols: list) -> np.ndarray:
+        # One int64 per row for a (possibly composite) key; nulls count as a value, as in df.duplicated
+        key = np.zeros(len(self.codes(table, cols[0])), dtype=np.int64)
+        for col in cols:
+            key = key * (self.n_keys[col] + 1) + (self.codes(table, col) + 1)
+        return key
+
+    def present(self, table: str, col: str) -> np.ndarray:
+        # Boolean lookup table over the domain: which keys occur in table.col (built once)
+        if (table, col) not in self._present:
+            codes = self.codes(table, col)
+            hit = np.zeros(self.n_keys[col], dtype=bool)
+            hit[codes[codes >= 0]] = True
+            self._present[(table, col)] = hit
+        return self._present[(table, col)]
+
+    def anti_join(self, child: str, child_col: str, parent: str, parent_col: str) -> np.ndarray:
+        # Mask of child rows whose key has no parent match
+        left = self.codes(child, child_col)
+        return (left >= 0) & ~self.present(parent, parent_col)[left]
+
+
+def parse_dates(s: pd.Series) -> pd.Series:
+    # Arrow's cast is several times faster than to_datetime; columns it cannot cast
+    # (unparseable values, no pyarrow) fall back to to_datetime with errors coerced
+    try:
+        return s.astype("timestamp[us][pyarrow]").astype("datetime64[us]")
+    except (ImportError, TypeError, ValueError):
+        return pd.to_datetime(s, errors="coerce", format="ISO8601")
+
+
+def check_table(df: pd.DataFrame, keys: KeyIndex, name: str, grain: list) -> dict:
+    report = {
+        "rows": int(len(df)),
+        "null_rate": {c: round(float(r), 6) for c, r in df.isna().mean().items() if r > 0},
+    }
+    if grain and all(keys.has(name, c) for c in grain):
+        row_key = keys.row_keys(name, grain)
+        if len(grain) == 1:
+            counts, inverse = np.bincount(row_key), row_key
+        else:
+            inverse, uniques = pd.factorize(row_key)
+            counts = np.bincount(inverse, minlength=len(uniques))
+        report["grain"] = grain
+        report["duplicate_rows"] = int((counts[inverse] > 1).sum())
+        report["duplicate_keys"] = int((counts > 1).sum())
+    return report
+
+
+def check_relationship(df: pd.DataFrame, keys: KeyIndex, child: str, child_col: str, parent: str, parent_col: str) -> dict:
+    left = keys.codes(child, child_col)
+    orphan = keys.anti_join(child, child_col, parent, parent_col)
+    orphan_codes, first = np.unique(left[orphan], return_index=True)
+    orphan_rows = int(orphan.sum())
+    examples = df[child_col].iloc[np.flatnonzero(orphan)[np.sort(first)[:N_EXAMPLES]]]
+    return {
+        "check": f"{child}.{child_col} -> {parent}.{parent_col}",
+        "keys": int(keys.present(child, child_col).sum()),
+        "orphan_keys": int(len(orphan_codes)),
+        "orphan_rows": orphan_rows,
+        "orphan_row_rate": round(orphan_rows / len(left), 6) if len(left) else 0.0,
+        "null_keys": int((left < 0).sum()),
+        "examples": [str(k) for k in examples],
+    }
+
+
+def check_fanout(keys: KeyIndex, table: str, key: str) -> dict:
+    codes = keys.codes(table, key)
+    counts = np.bincount(codes[codes >= 0], minlength=keys.n_keys[key])
+    multi = counts[counts > 1]
+    return {
+        "check": f"{table} rows per {key}",
+        "keys_with_multiple_rows": int(len(multi)),
+        "extra_rows": int((multi - 1).sum()),
+        "max_rows_per_key": int(counts.max()) if len(counts) else 0,
+    }
+
+
+def check_date_order(df: pd.DataFrame, dates: dict, later: str, earlier: str, name: str) -> dict:
+    a, b = dates[later], dates[earlier]
+    bad = (a < b).to_numpy()
+    key = df.columns[0]
+    return {
+        "check": name,
+        "compared": int((a.notna() & b.notna()).sum()),
+        "violations": int(bad.sum()),
+        "examples": df.loc[bad, key].head(N_EXAMPLES).astype(str).tolist(),
+    }
+
+
+def validate_tables(tables: dict) -> dict:
+    """Key-integrity and data-quality report for the raw tables, run before the joins."""
+    start = time.perf_counter()
+    date_checks = [
+        d for d in DATE_ORDER
+        if d[0] in tables and d[1] in tables[d[0]].columns and d[2] in tables[d[0]].columns
+    ]
+    # parse each timestamp column once, however many checks use it
+    date_cols = {(t, c) for t, later, earlier, _ in date_checks for c in (later, earlier)}
+    dates = {(t, c): parse_dates(tables[t][c]) for t, c in date_cols}
+    relationships = [rel for rel in RELATIONSHIPS if rel[0] in tables and rel[2] in tables]
+    grains = {
+        name: grain for name, grain in GRAINS.items()
+        if name in tables and all(c in tables[name].columns for c in grain)
+    }
+    keys = KeyIndex(tables, relationships, grains)
+    report = {
+        "tables": {name: check_table(df, keys, name, grains.get(name, [])) for name, df in tables.items()},
+        "relationships": [
+            check_relationship(tables[rel[0]], keys, *rel) for rel in relationships
+        ],
+        "fanout": [check_fanout(keys, t, k) for t, k in FANOUT if keys.has(t, k)],
+        "date_order": [
+            check_date_order(tables[t], {c: dates[(t, c)] for c in (later, earlier)}, later, earlier, name)
+            for t, later, earlier, name in date_checks
+        ],
+    }
+    report["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def summarize(report: dict) -> list:
+    # One line per check that found something
+    lines = []
+    for name, t in report["tables"].items():
+        if t.get("duplicate_rows"):
+            lines.append(f"{name}: {t['duplicate_rows']:,} rows share a {'+'.join(t['grain'])} key")
+    for r in report["relationships"]:
+        if r["orphan_keys"]:
+            lines.append(f"{r['check']}: {r['orphan_keys']:,} orphan keys ({r['orphan_rows']:,} rows, {r['orphan_row_rate']:.2%})")
+    for f in report["fanout"]:
+        if f["keys_with_multiple_rows"]:
+            lines.append(f"{f['check']}: {f['keys_with_multiple_rows']:,} keys with >1 row (max {f['max_rows_per_key']})")
+    for d in report["date_order"]:
+        if d["violations"]:
+            lines.append(f"{d['check']}: {d['violations']:,} of {d['compared']:,} rows")
+    return lines
+
+
+def write_report(report: dict, path) -> None:
+    Path(path).write_text(json.dumps(report, indent=2))
@@ -0,0 +1,243 @@
+"""Batch executive reports: one static HTML page per state and per top category.
+
+Uses the dashboard's query backend (dashboard_queries: DuckDB over the
+Parquet master, else pandas over the CSV) without importing Streamlit. The
+KPIs and chart data for every segment of a dimension come from a single
+grouped aggregation; the pages are then rendered across a process pool.
+
+    python executive_reports.py --out reports --top-categories 15
+    python executive_reports.py --data-dir /data/olist --workers 8
+"""
+import argparse
+import html
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import plotly.express as px
+from plotly.offline import get_plotlyjs
+
+from dashboard_queries import fmt_kpi, open_queries, overall_kpis, report_columns, segment_kpis
+
+
+# Config
+OUT_DIR = "reports"
+TOP_CATEGORIES = 15         # categories (by sales) that get their own report
+TOP_BREAKDOWN = 10          # bars in each report's breakdown chart
+PRIMARY = "#4f46e5"
+PLOTLY_JS = "plotly.min.js"     # written once per output folder and shared by every page
+
+KPI_LABELS = {
+    "total_sales": "Total Sales",
+    "total_orders": "Total Orders",
+    "unique_customers": "Unique Customers",
+    "aov": "Avg Order Value",
+    "delivery_success": "Delivery Success %",
+    "avg_delivery_days": "Avg Delivery Days",
+}
+
+
+# Render jobs (one grouped pass per dimension)
+
+def _slug(segment, taken: set) -> str:
+    # file-safe name, suffixed when two segments map to the same one (e.g. "a b" and "a_b");
+    # compared case-insensitively so "SP" and "sp" don't overwrite each other on Windows/macOS
+    base = slug = re.sub(r"[^A-Za-z0-9_-]+", "_", str(segment)).strip("_") or "unknown"
+    n = 1
+    while slug.lower() in taken:
+        n += 1
+        slug = f"{base}_{n}"
+    taken.add(slug.lower())
+    return slug
+
+
+def _split(frame: Optional[pd.DataFrame], by: str) -> dict:
+    # per-segment slices of a grouped result, in one pass
+    if frame is None:
+        return {}
+    return {key: part.drop(columns=by) for key, part in frame.groupby(by, sort=False)}
+
+
+def build_jobs(queries, top_categories: int = TOP_CATEGORIES) -> list:
+    """Render jobs (KPIs + chart frames) for the whole dataset, every state and the top categories.
+
+    Each dimension costs three aggregations (KPIs, monthly trend, breakdown)
+    regardless of how many segments it has.
+    """
+    cols = report_columns(queries)
+    sales = cols["sales"]
+    trend_by = ["year", "month_num"] if "year" in queries.columns and "month_num" in queries.columns else None
+
+    def trend(by: list) -> Optional[pd.DataFrame]:
+        if not sales or not trend_by:
+            return None
+        return queries.aggregate(by=by + trend_by, aggs={"Sales": (sales, "sum")})
+
+    def breakdown(by: list) -> Optional[pd.DataFrame]:
+        if not sales or not all(by):
+            return None
+        return queries.aggregate(by=by, aggs={"Sales": (sales, "sum")})
+
+    jobs = [{
+        "dimension": "all", "segment": "All", "slug": "all", "title": "Whole dataset",
+        "kpis": overall_kpis(queries, cols), "trend": trend([]),
+        "breakdown": breakdown([cols["category"]]), "breakdown_col": cols["category"],
+    }]
+    # state x category sales serve both the state reports (top categories) and the category reports (top states)
+    pairs = breakdown([cols["state"], cols["category"]])
+    dims = []
+    if cols["state"]:
+        dims.append(("state", cols["state"], cols["category"], None))
+    if cols["category"]:
+        dims.append(("category", cols["category"], cols["state"], top_categories))
+    for dimension, col, other, top in dims:
+        kpis = segment_kpis(queries, cols, by=col)
+        if top and "total_sales" in kpis:
+            kpis = kpis.nlargest(top, "total_sales")
+        trends = _split(trend([col]), col)
+        breakdowns = _split(pairs, col) if other else {}
+        taken = set()
+        for row in kpis.to_dict("records"):
+            segment = row.pop(col)
+            jobs.append({
+                "dimension": dimension, "segment": segment, "slug": _slug(segment, taken),
+                "title": f"{dimension.title()}: {segment}",
+                "kpis": {k: (None if pd.isna(v) else float(v)) for k, v in row.items()},
+                "trend": trends.get(segment), "breakdown": breakdowns.get(segment), "breakdown_col": other,
+            })
+    return jobs
+
+
+# Rendering (module level so it can run in worker processes)
+
+def report_path(out_dir: Path, job: dict) -> Path:
+    if job["dimension"] == "all":
+        return Path(out_dir) / "all.html"
+    return Path(out_dir) / job["dimension"] / f"{job['slug']}.html"
+
+
+def _figure_html(fig) -> str:
+    fig.update_layout(template="plotly_white", margin=dict(l=10, r=10, t=40, b=10), height=380)
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={"displayModeBar": False})
+
+
+def render_report(job: dict, out_dir: Path) -> Path:
+    path = report_path(out_dir, job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    depth = len(path.relative_to(out_dir).parts) - 1
+    charts = []
+
+    trend = job["trend"]
+    if trend is not None and not trend.empty:
+        trend = trend.sort_values(["year", "month_num"])
+        trend["Month"] = pd.to_datetime(dict(year=trend["year"].astype(int), month=trend["month_num"].astype(int), day=1))
+        fig = px.line(trend, x="Month", y="Sales", markers=True, title="Monthly Sales Trend")
+        fig.update_traces(line=dict(color=PRIMARY))
+        charts.append(_figure_html(fig))
+
+    breakdown, bcol = job["breakdown"], job["breakdown_col"]
+    if breakdown is not None and not breakdown.empty and bcol:
+        top = breakdown.nlargest(TOP_BREAKDOWN, "Sales").sort_values("Sales")
+        label = "Categories" if job["dimension"] != "category" else "States"
+        fig = px.bar(top, x="Sales", y=bcol, orientation="h", title=f"Top {len(top)} {label} by Sales",
+                     color_discrete_sequence=[PRIMARY])
+        fig.update_yaxes(title=None)
+        charts.append(_figure_html(fig))
+
+    cards = "".join(
+        f"<div class='kpi'><div class='kpi-label'>{label}</div><div class='kpi-value'>{fmt_kpi(name, job['kpis'].get(name))}</div></div>"
+        for name, label in KPI_LABELS.items() if name in job["kpis"]
+    )
+    title = html.escape(job["title"])
+    path.write_text(REPORT_TEMPLATE.format(
+        title=title, plotly_js="../" * depth + PLOTLY_JS, cards=cards,
+        charts="".join(f"<div class='chart'>{c}</div>" for c in charts) or "<p>No chart data for this segment.</p>",
+    ), encoding="utf-8")
+    return path
+
+
+def _render_task(args: tuple) -> str:
+    job, out_dir = args
+    return str(render_report(job, out_dir))
+
+
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Olist Executive Report - {title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 24px; color: #1f2937; }}
+.kpis {{ display: flex; flex-wrap: wrap; gap: 12px; margin-bottom: 16px; }}
+.kpi {{ background: #f3f4f6; padding: 10px 16px; border-radius: 8px; text-align: center; min-width: 140px; }}
+.kpi-label {{ color: #6b7280; font-size: 12px; }}
+.kpi-value {{ font-size: 20px; font-weight: 700; }}
+.charts {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(480px, 1fr)); gap: 16px; }}
+</style></head>
+<body>
+<h1>Olist Executive Report - {title}</h1>
+<div class="kpis">{cards}</div>
+<div class="charts">{charts}</div>
+</body></html>
+"""
+
+
+def write_index(jobs: list, paths: list, out_dir: Path) -> Path:
+    rows = []
+    for job, path in zip(jobs, paths):
+        link = Path(path).relative_to(out_dir).as_posix()
+        cells = "".join(f"<td>{fmt_kpi(name, job['kpis'].get(name))}</td>" for name in KPI_LABELS)
+        rows.append(f"<tr><td><a href='{link}'>{html.escape(job['title'])}</a></td>{cells}</tr>")
+    header = "".join(f"<th>{label}</th>" for label in KPI_LABELS.values())
+    index = Path(out_dir) / "index.html"
+    index.write_text(
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Olist Executive Reports</title></head><body>"
+        f"<h1>Olist Executive Reports</h1><table border='1' cellpadding='4'><tr><th>Report</th>{header}</tr>"
+        + "".join(rows) + "</table></body></html>",
+        encoding="utf-8",
+    )
+    return index
+
+
+def render_reports(jobs: list, out_dir: Path, workers: Optional[int] = None) -> list:
+    """Write one HTML page per job (across a process pool) plus an index; returns the page paths."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / PLOTLY_JS).write_text(get_plotlyjs(), encoding="utf-8")
+    tasks = [(job, out_dir) for job in jobs]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        paths = [_render_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = list(pool.map(_render_task, tasks, chunksize=max(1, math.ceil(len(tasks) / (workers * 4)))))
+    write_index(jobs, paths, out_dir)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render per-state and per-category executive reports")
+    parser.add_argument("--data-dir", default=".", help="folder holding the master CSV/Parquet")
+    parser.add_argument("--out", default=OUT_DIR, help="output folder for the HTML reports")
+    parser.add_argument("--top-categories", type=int, default=TOP_CATEGORIES, help="categories (by sales) to report on")
+    parser.add_argument("--workers", type=int, help="render processes (default: CPU count)")
+    args = parser.parse_args()
+
+    queries = open_queries(Path(args.data_dir))
+    if queries is None:
+        raise SystemExit(f"No master dataset found in {args.data_dir}")
+
+    start = time.perf_counter()
+    jobs = build_jobs(queries, args.top_categories)
+    aggregated = time.perf_counter()
+    paths = render_reports(jobs, Path(args.out), args.workers)
+    done = time.perf_counter()
+    print(f"{len(paths)} reports in {args.out}/ ({queries.backend} aggregation {aggregated - start:.1f}s, "
+          f"rendering {done - aggregated:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
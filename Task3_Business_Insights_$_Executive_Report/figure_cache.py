@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Hashable, Iterable, Optional
+
+import pandas as pd
+
+
+# Limits (tune as the data grows)
+MAX_CACHED_FIGURES = 256
+MAX_CACHE_BYTES = 64 * 1024 * 1024     # serialized figure JSON held in memory
+MAX_MAP_POINTS = 300                   # points above this are folded into an "Other" bucket
+
+
+# Figure cache
+
+class FigureCache:
+    """LRU cache of Plotly figures keyed by (chart, filters, data version).
+
+    Entries are evicted least-recently-used first once either the entry count
+    or the total serialized payload size goes over its cap.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_FIGURES, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()     # Streamlit runs each session in its own thread
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, fig) -> None:
+        nbytes = len(fig.to_json())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (fig, nbytes)
+            self.total_bytes += nbytes
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Optional[object]]):
+        fig = self.get(key)
+        if fig is None:
+            fig = build()
+            if fig is not None:
+                self.put(key, fig)
+        return fig
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def data_version(paths: Iterable[Path]) -> tuple:
+    # Cheap fingerprint of the input files: changes whenever a file is replaced or edited
+    version = []
+    for p in paths:
+        p = Path(p)
+        if p.exists():
+            st = p.stat()
+            version.append((p.name, st.st_mtime_ns, st.st_size))
+    return tuple(version)
+
+
+# Downsampling helpers
+
+def top_n_with_other(df: pd.DataFrame, value_col: str, label_col: str,
+                     n: int = MAX_MAP_POINTS, lat_col: str = "lat", lon_col: str = "lon",
+                     other_label: str = "other") -> pd.DataFrame:
+    # Keep the n-1 largest points and fold the rest into one point at their value-weighted centre
+    if len(df) <= n:
+        return df
+    df = df.sort_values(value_col, ascending=False)
+    head, tail = df.iloc[:n - 1], df.iloc[n - 1:]
+    weights = tail[value_col].clip(lower=0)
+    if weights.sum() <= 0:
+        weights = pd.Series(1.0, index=tail.index)
+    other = {
+        label_col: f"{other_label} ({len(tail):,})",
+        value_col: tail[value_col].sum(),
+        lat_col: (tail[lat_col] * weights).sum() / weights.sum(),
+        lon_col: (tail[lon_col] * weights).sum() / weights.sum(),
+    }
+    return pd.concat([head, pd.DataFrame([other])], ignore_index=True)
+
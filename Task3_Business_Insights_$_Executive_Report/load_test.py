@@ -0,0 +1,363 @@
+"""Concurrent-session load test for dashboard_app.py.
+
+Two modes:
+
+threads (default): N sessions as threads of one process, sharing one query
+backend (open_queries) and one FigureCache, the way sessions of one
+`streamlit run` server share st.cache_resource. Every rerun does the
+dashboard's per-rerun work through the same functions the app calls
+(dashboard_charts: summary CSVs, sidebar options, KPI row and every chart
+through the figure cache, serialized as st.plotly_chart does), so latency
+includes contention for the GIL and the backend, and memory is the growth
+of the one shared process. Streamlit's own script runner and websocket
+traffic are not included.
+
+apptest: N headless Streamlit sessions (streamlit.testing AppTest), each in
+its own process: AppTest swaps process-global runtime state on every run,
+so sessions cannot safely share a process. This runs the real script end to
+end and serves as a smoke test; sessions share no caches and each pays its
+own cold start, so memory is a whole process per session.
+
+In both modes each session makes random Year / State / Product selections
+and tab switches; every action triggers a rerun whose latency is recorded.
+A rerun counts as failed unless it ran to completion.
+
+    python load_test.py --sessions 8 --actions 20 --label baseline
+    python load_test.py --sessions 8 --actions 20 --label fig-cache --compare load_test_results/baseline.json
+    python load_test.py --mode apptest --sessions 4 --actions 5
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:     # falls back to peak RSS from resource (Unix only)
+    psutil = None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from streamlit import config as st_config
+from streamlit.logger import set_log_level
+from streamlit.runtime.state import SCRIPT_RUN_WITHOUT_ERRORS_KEY
+from streamlit.testing.v1 import AppTest
+
+from dashboard_charts import (
+    CHARTS, GEO_FILE, SUMMARY_FILES, ChartData, chart_key, filter_options, kpi_row, make_filters,
+    read_city_coords, read_summaries,
+)
+from dashboard_queries import MASTER_FILE, MASTER_PARQUET, open_queries
+from figure_cache import FigureCache, data_version
+
+
+APP_PATH = Path(__file__).resolve().parent / "dashboard_app.py"
+RESULTS_DIR = Path(__file__).resolve().parent / "load_test_results"
+SIDEBAR_FILTERS = ["Year", "State", "Product Category"]
+# Tabs are rendered on every rerun, so a tab switch costs nothing on the server;
+# it is modelled as a plain rerun (an upper bound on its cost)
+ACTIONS = SIDEBAR_FILTERS + ["tab"]
+PERCENTILES = [50, 90, 95, 99]
+N_ERROR_EXAMPLES = 5
+MODES = ["threads", "apptest"]
+
+
+def rss_mb() -> Optional[float]:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def quiet() -> None:
+    # keep per-rerun warnings out of the report
+    st_config.set_option("logger.level", "error")
+    set_log_level("error")
+
+
+def new_record(session_id: int) -> dict:
+    return {"session": session_id, "initial_ms": None, "latencies_ms": [], "errors": 0,
+            "error_examples": [], "rss_mb": None}
+
+
+def record_error(record: dict, error) -> None:
+    record["errors"] += 1
+    if len(record["error_examples"]) < N_ERROR_EXAMPLES:
+        record["error_examples"].append(str(error)[:200])
+
+
+def timed_run(at: AppTest, record: dict) -> Optional[float]:
+    # Latency in ms, or None (and the error recorded) unless the script ran to completion
+    at.session_state[SCRIPT_RUN_WITHOUT_ERRORS_KEY] = False
+    t = time.perf_counter()
+    try:
+        at.run()
+    except Exception as e:      # timeouts and runner errors
+        error = repr(e)
+    else:
+        if at.exception:
+            error = at.exception[0].value
+        elif not at.session_state[SCRIPT_RUN_WITHOUT_ERRORS_KEY]:
+            error = "script did not run to completion"
+        else:
+            return (time.perf_counter() - t) * 1000
+    record_error(record, error)
+    return None
+
+
+# Threads mode: one process, shared backend and figure cache
+
+def simulated_rerun(queries, data_dir: Path, cache: FigureCache, version: tuple, city_coords: dict,
+                    selection: dict) -> None:
+    # The work dashboard_app.py does on a rerun, minus Streamlit itself
+    data = ChartData(queries, read_summaries(data_dir), lambda: city_coords)
+    filter_options(data)
+    filters = make_filters(data, selection["Year"], selection["State"], selection["Product Category"])
+    kpi_row(data, filters)
+    for chart, (build, _) in CHARTS.items():
+        fig = cache.get_or_build(chart_key(chart, filters, version), lambda: build(data, filters))
+        if fig is not None:
+            fig.to_json()       # st.plotly_chart serializes the figure on every rerun
+
+
+def timed_call(rerun: Callable[[], None], record: dict) -> Optional[float]:
+    t = time.perf_counter()
+    try:
+        rerun()
+    except Exception as e:
+        record_error(record, repr(e))
+        return None
+    return (time.perf_counter() - t) * 1000
+
+
+def thread_session(rerun: Callable[[dict], None], options: dict, session_id: int, n_actions: int,
+                   seed: int, start: threading.Barrier, record: dict) -> None:
+    rng = random.Random(seed * 1000 + session_id)
+    selection = {f: "All" for f in SIDEBAR_FILTERS}
+    try:
+        start.wait()
+        record["initial_ms"] = timed_call(lambda: rerun(selection), record)
+        for _ in range(n_actions):
+            action = rng.choice(ACTIONS)
+            if action != "tab" and options.get(action):
+                selection[action] = rng.choice(options[action])
+            ms = timed_call(lambda: rerun(selection), record)
+            if ms is not None:
+                record["latencies_ms"].append(ms)
+    except Exception as e:      # the session itself broke; its missing reruns count as failed
+        record["error_examples"].append(repr(e)[:200])
+
+
+def run_threads(sessions: int, actions: int, seed: int = 0, data_dir: Path = Path(".")) -> dict:
+    # Loaded once, as st.cache_resource does for the first session of a server
+    t = time.perf_counter()
+    queries = open_queries(data_dir)
+    city_coords = read_city_coords(data_dir)
+    cache = FigureCache()
+    version = data_version(Path(data_dir) / fn for fn in [MASTER_PARQUET, MASTER_FILE, *SUMMARY_FILES.values(), GEO_FILE])
+    options = filter_options(ChartData(queries, read_summaries(data_dir), lambda: city_coords))
+    load_s = time.perf_counter() - t
+
+    def rerun(selection: dict) -> None:
+        simulated_rerun(queries, data_dir, cache, version, city_coords, selection)
+
+    base = rss_mb()
+    start = threading.Barrier(sessions + 1)
+    records = [new_record(i) for i in range(sessions)]
+    threads = [
+        threading.Thread(target=thread_session, args=(rerun, options, i, actions, seed, start, records[i]), daemon=True)
+        for i in range(sessions)
+    ]
+    for th in threads:
+        th.start()
+    start.wait()
+    t0 = time.perf_counter()
+    peak = base
+    for th in threads:
+        while th.is_alive():
+            th.join(timeout=0.1)
+            if base is not None:
+                peak = max(peak, rss_mb())      # sampled while the sessions run
+    wall = time.perf_counter() - t0
+
+    lookups = cache.hits + cache.misses
+    return summarize("threads", sessions, actions, seed, records, wall, extra={
+        "load_s": round(load_s, 3),
+        "base_mb": round(base, 1) if base is not None else None,
+        "peak_mb": round(peak, 1) if peak is not None else None,
+        # growth of the shared process over the loaded data, per session
+        "per_session_mb": round((peak - base) / sessions, 1) if base is not None else None,
+        "figure_cache_hit_rate": round(cache.hits / lookups, 3) if lookups else None,
+    })
+
+
+# AppTest mode: one process per session, the real script end to end
+
+def run_session(app_path: Path, session_id: int, n_actions: int, seed: int, timeout: float,
+                start, results) -> None:
+    # One session per process
+    quiet()
+    rng = random.Random(seed * 1000 + session_id)
+    record = new_record(session_id)
+    try:
+        try:
+            at = AppTest.from_file(str(app_path), default_timeout=timeout)
+        finally:
+            start.wait()        # reached even if from_file fails, so the other sessions are not left waiting
+        record["initial_ms"] = timed_run(at, record)
+        for _ in range(n_actions):
+            action = rng.choice(ACTIONS)
+            if action != "tab":
+                box = next((b for b in at.sidebar.selectbox if b.label == action), None)
+                if box is not None and box.options:
+                    box.select_index(rng.randrange(len(box.options)))
+            ms = timed_run(at, record)
+            if ms is not None:
+                record["latencies_ms"].append(ms)
+    except Exception as e:      # the session itself broke; its missing reruns count as failed
+        record["error_examples"].append(repr(e)[:200])
+    record["rss_mb"] = rss_mb()
+    results.put(record)
+
+
+def run_apptest(sessions: int, actions: int, seed: int = 0, timeout: float = 120,
+                app_path: Path = APP_PATH) -> dict:
+    ctx = mp.get_context("spawn")       # same start method on every platform
+    start = ctx.Barrier(sessions + 1)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=run_session, args=(app_path, i, actions, seed, timeout, start, results), daemon=True)
+        for i in range(sessions)
+    ]
+    for p in procs:
+        p.start()
+    # A session that dies before the barrier (e.g. crashes while importing) would leave it
+    # short forever: give up once a process has exited or the timeout passes
+    deadline = time.perf_counter() + timeout
+    while start.n_waiting < sessions and all(p.is_alive() for p in procs) and time.perf_counter() < deadline:
+        time.sleep(0.1)
+    startup_error = None
+    try:
+        if start.n_waiting < sessions:
+            start.abort()
+        start.wait(timeout=timeout)
+    except threading.BrokenBarrierError:
+        startup_error = f"{sum(not p.is_alive() for p in procs)} of {sessions} sessions exited before the start"
+    t0 = time.perf_counter()
+    records = []
+    while len(records) < sessions and (any(p.is_alive() for p in procs) or not results.empty()):
+        try:
+            records.append(results.get(timeout=1))
+        except queue.Empty:
+            pass
+    wall = time.perf_counter() - t0
+    for p in procs:
+        p.join(timeout=5)
+
+    rss = [r["rss_mb"] for r in records if r["rss_mb"]]
+    return summarize("apptest", sessions, actions, seed, records, wall, extra={
+        # RSS of a whole session process (Streamlit, pandas and the data), not the cost of one more session
+        "process_mb": round(float(np.mean(rss)), 1) if rss else None,
+        "process_mb_max": round(float(np.max(rss)), 1) if rss else None,
+    }, errors=[startup_error] if startup_error else [])
+
+
+def summarize(mode: str, sessions: int, actions: int, seed: int, records: list, wall: float,
+              extra: dict, errors: Optional[list] = None) -> dict:
+    latencies = np.array([ms for r in records for ms in r["latencies_ms"]])
+    initial = np.array([r["initial_ms"] for r in records if r["initial_ms"] is not None])
+    attempted = sessions * (actions + 1)
+    completed = len(latencies) + len(initial)
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "actions_per_session": actions,
+        "seed": seed,
+        "completed_sessions": len(records),
+        "reruns": attempted,
+        # every rerun that did not run to completion, including those of crashed sessions
+        "errors": attempted - completed,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(completed / wall, 3) if wall else None,
+        "initial_ms": {f"p{p}": round(float(np.percentile(initial, p)), 1) for p in PERCENTILES} if len(initial) else {},
+        "rerun_ms": {f"p{p}": round(float(np.percentile(latencies, p)), 1) for p in PERCENTILES} if len(latencies) else {},
+        **extra,
+        "error_examples": (errors or []) + [e for r in records for e in r["error_examples"]][:N_ERROR_EXAMPLES],
+    }
+
+
+def flatten(summary: dict) -> dict:
+    flat = {}
+    for k, v in summary.items():
+        if isinstance(v, dict):
+            flat.update({f"{k}.{kk}": vv for kk, vv in v.items()})
+        else:
+            flat[k] = v
+    return flat
+
+
+def print_summary(summary: dict, baseline: Optional[dict] = None) -> None:
+    cur = flatten({k: v for k, v in summary.items() if k != "error_examples"})
+    old = flatten(baseline) if baseline else {}
+    print(f"{'metric':<22}{'value':>12}" + (f"{'baseline':>12}{'change':>10}" if old else ""))
+    for k, v in cur.items():
+        line = f"{k:<22}{str(v):>12}"
+        if old:
+            b = old.get(k)
+            change = ""
+            if isinstance(v, (int, float)) and isinstance(b, (int, float)) and b:
+                change = f"{(v - b) / abs(b) * 100:+.1f}%"
+            line += f"{str(b):>12}{change:>10}"
+        print(line)
+    for e in summary.get("error_examples", []):
+        print(f"  error: {e}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for dashboard_app.py")
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent sessions")
+    parser.add_argument("--actions", type=int, default=10, help="random interactions per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=MODES, default="threads",
+                        help="threads: one shared process (capacity); apptest: the real script, one process per session")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout (s), apptest mode")
+    parser.add_argument("--app", default=str(APP_PATH), help="Streamlit script to load test, apptest mode")
+    parser.add_argument("--data-dir", default=".", help="folder holding the dashboard's CSV/Parquet files")
+    parser.add_argument("--label", help="save results to load_test_results/<label>.json")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    quiet()
+    app_path = Path(args.app).resolve()
+    sys.path.insert(0, str(app_path.parent))      # the app's local modules (passed on to the session processes)
+    os.chdir(args.data_dir)                       # the app reads its data from the working directory
+
+    if args.mode == "threads":
+        summary = run_threads(args.sessions, args.actions, args.seed)
+    else:
+        summary = run_apptest(args.sessions, args.actions, args.seed, args.timeout, app_path)
+    print_summary(summary, baseline)
+
+    if args.label:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        out = RESULTS_DIR / f"{args.label}.json"
+        out.write_text(json.dumps(summary, indent=2))
+        print(f"\nSaved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Config
+BATCH_SIZE = 20_000         # reviews per worker task
+N_KEYWORDS = 3
+MIN_KEYWORD_LEN = 4
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+# Small Portuguese sentiment lexicon (accent-stripped, lower case), weights in [-2, 2]
+LEXICON = {
+    # positive
+    "otimo": 2, "otima": 2, "excelente": 2, "perfeito": 2, "perfeita": 2, "maravilhoso": 2, "adorei": 2, "amei": 2,
+    "recomendo": 2, "parabens": 2, "bom": 1, "boa": 1, "gostei": 1, "rapido": 1, "rapida": 1, "satisfeito": 1,
+    "satisfeita": 1, "lindo": 1, "linda": 1, "qualidade": 1, "confiavel": 1, "certinho": 1, "correto": 1,
+    "antes": 1, "agradeco": 1, "obrigado": 1, "obrigada": 1, "super": 1, "top": 1, "show": 1, "chegou": 0.5,
+    "recebi": 0.5, "entregue": 0.5,
+    # negative
+    "pessimo": -2, "pessima": -2, "horrivel": -2, "pior": -2, "decepcionado": -2, "decepcionada": -2,
+    "enganosa": -2, "falso": -2, "ruim": -1, "atraso": -1, "atrasou": -1, "atrasado": -1, "atrasada": -1,
+    "defeito": -1, "defeituoso": -1, "quebrado": -1, "quebrada": -1, "danificado": -1, "errado": -1,
+    "errada": -1, "faltou": -1, "faltando": -1, "demorou": -1, "demora": -1, "problema": -1,
+    "insatisfeito": -1, "insatisfeita": -1, "devolver": -1, "devolucao": -1, "cancelar": -1,
+    "reclamacao": -1, "diferente": -1,
+}
+NEGATORS = {"nao", "nem", "nunca", "jamais"}
+CLAUSE_BREAKS = r"[.,;:!?/|()\n]+"     # a negator does not reach across these
+STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas", "um", "uma",
+    "para", "pra", "por", "com", "que", "se", "mas", "mais", "muito", "muita", "foi", "era", "esta", "estava",
+    "ja", "ate", "meu", "minha", "ele", "ela", "eu", "voce", "isso", "este", "esse", "essa", "ao", "aos",
+    "como", "ainda", "sem", "tambem", "so", "sim", "tudo", "bem", "sobre", "nao", "comment",
+}
+
+
+# Vectorized normalisation & tokenisation
+
+def normalize_text(text: pd.Series, keep_breaks: bool = False) -> pd.Series:
+    # lower case, strip accents and punctuation, collapse whitespace; with keep_breaks,
+    # clause breaks survive as a "|" token
+    text = (
+        text.fillna("").astype(str).str.lower()
+        .str.normalize("NFKD").str.encode("ascii", errors="ignore").str.decode("ascii")
+    )
+    if keep_breaks:
+        text = text.str.replace(CLAUSE_BREAKS, " | ", regex=True)
+    return (
+        text.str.replace(r"[^a-z0-9\s|]" if keep_breaks else r"[^a-z0-9\s]", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True).str.strip()
+    )
+
+
+def tokenize(review_ids: pd.Series, text: pd.Series) -> pd.DataFrame:
+    # one row per (review, token), in token order, with a clause number that changes
+    # at every clause break and every new review
+    tokens = normalize_text(text, keep_breaks=True).str.split().explode().dropna()
+    is_break = tokens.eq("|").to_numpy()
+    clause = np.cumsum(is_break) + pd.factorize(tokens.index)[0]
+    keep = ~is_break
+    return pd.DataFrame({
+        "review_id": review_ids.loc[tokens.index[keep]].values,
+        "clause": clause[keep],
+        "token": tokens.values[keep],
+    })
+
+
+# Worker tasks (module level so they can be pickled)
+
+def _score_batch(batch: pd.DataFrame) -> tuple:
+    # title and message are separate clauses
+    text = batch["review_comment_title"].fillna("").astype(str) + "\n" + batch["review_comment_message"].fillna("").astype(str)
+    tokens = tokenize(batch["review_id"], text)
+
+    # lexicon sentiment; a negator up to two tokens back in the same clause flips the sign
+    weight = tokens["token"].map(LEXICON).astype("float64")
+    same_clause = tokens["clause"].eq(tokens["clause"].shift(1))
+    same_clause2 = tokens["clause"].eq(tokens["clause"].shift(2))
+    negated = (tokens["token"].shift(1).isin(NEGATORS) & same_clause) | (tokens["token"].shift(2).isin(NEGATORS) & same_clause2)
+    weight = weight.where(~negated, -weight)
+    hits = weight.notna()
+    scored = pd.DataFrame({"review_id": tokens["review_id"], "weight": weight / 2, "hit": hits})
+    per_review = scored.groupby("review_id", sort=False).agg(total=("weight", "sum"), hits=("hit", "sum"))
+
+    feats = pd.DataFrame({"review_id": batch["review_id"].values})
+    feats["n_tokens"] = feats["review_id"].map(tokens["review_id"].value_counts()).fillna(0).values
+    feats = feats.merge(per_review, on="review_id", how="left")
+    feats["sentiment"] = (feats["total"] / feats["hits"].where(feats["hits"] > 0)).fillna(0.0)
+
+    # content tokens for keyword extraction + this batch's document frequencies
+    content = tokens.loc[~tokens["token"].isin(STOPWORDS) & tokens["token"].str.len().ge(MIN_KEYWORD_LEN)
+                         & ~tokens["token"].str.isdigit(), ["review_id", "token"]].drop_duplicates()
+    doc_freq = content["token"].value_counts()
+    return feats[["review_id", "n_tokens", "sentiment"]], content, doc_freq
+
+
+def _keywords_batch(args: tuple) -> pd.DataFrame:
+    content, idf, k = args
+    ranked = content.assign(idf=content["token"].map(idf)).sort_values(["review_id", "idf"], ascending=[True, False], kind="stable")
+    ranked["rank"] = ranked.groupby("review_id", sort=False).cumcount()
+    # one column per keyword slot, then a vectorized join (no per-review Python call)
+    slots = ranked[ranked["rank"] < k].pivot(index="review_id", columns="rank", values="token")
+    if slots.empty:
+        # no content tokens in this batch
+        return pd.DataFrame({"review_id": content["review_id"].iloc[:0], "keywords": pd.Series(dtype=object)})
+    keywords = slots[0].astype(str)
+    for i in range(1, slots.shape[1]):
+        keywords = keywords.str.cat(slots[i], sep=" ", na_rep="").str.rstrip()
+    return keywords.rename("keywords").reset_index()
+
+
+# Stage entry point
+
+def review_features(reviews: pd.DataFrame, workers: Optional[int] = None, batch_size: int = BATCH_SIZE) -> pd.DataFrame:
+    """Per-review text features (one row per review_id).
+
+    Runs on the deduplicated reviews table, in batches across a process pool:
+    normalised token count, lexicon sentiment in [-1, 1] with a label, and
+    the most distinctive keywords (by corpus IDF).
+    """
+    reviews = reviews.drop_duplicates("review_id")[["review_id", "review_comment_title", "review_comment_message"]].reset_index(drop=True)
+    n_batches = max(1, math.ceil(len(reviews) / batch_size))
+    batches = [reviews.iloc[i * batch_size:(i + 1) * batch_size] for i in range(n_batches)]
+    workers = min(workers or os.cpu_count() or 1, n_batches)
+
+    def run(func, tasks):
+        if workers <= 1:
+            return [func(t) for t in tasks]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, tasks))
+
+    # pass 1: normalise, tokenise, score; collect document frequencies
+    scored = run(_score_batch, batches)
+    feats = pd.concat([s[0] for s in scored], ignore_index=True)
+    doc_freq = pd.concat([s[2] for s in scored]).groupby(level=0).sum()
+    idf = np.log(len(reviews) / doc_freq)
+
+    # pass 2: keywords ranked by corpus-wide IDF
+    keywords = pd.concat(run(_keywords_batch, [(s[1], idf, N_KEYWORDS) for s in scored]), ignore_index=True)
+
+    feats = feats.merge(keywords, on="review_id", how="left")
+    feats["keywords"] = feats["keywords"].fillna("")
+    feats["sentiment_label"] = pd.Categorical(
+        np.select(
+            [feats["n_tokens"].eq(0), feats["sentiment"] > POSITIVE_THRESHOLD, feats["sentiment"] < NEGATIVE_THRESHOLD],
+            ["no_comment", "positive", "negative"],
+            "neutral",
+        ),
+        categories=["positive", "neutral", "negative", "no_comment"],
+    )
+    # compact dtypes: these are joined back onto the master by review_id
+    feats["sentiment"] = feats["sentiment"].astype("float32")
+    feats["n_tokens"] = feats["n_tokens"].astype("int32")
+    return feats[["review_id", "sentiment", "sentiment_label", "n_tokens", "keywords"]]
@@ -0,0 +1,237 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:     # artifacts fall back to pickle
+    pa = None
+
+
+# Config (the size cap can be overridden with OLIST_STAGE_CACHE_MB)
+CACHE_DIR = Path(".stage_cache")
+MAX_CACHE_BYTES = int(os.environ.get("OLIST_STAGE_CACHE_MB", "4096")) * 1024 * 1024
+CACHE_FORMAT = 1        # bump to invalidate every entry after changing the storage layout
+
+
+class Artifact:
+    """Output of a cached stage: the value plus the key it was stored under."""
+
+    def __init__(self, key: str, value, hit: bool):
+        self.key = key
+        self.value = value
+        self.hit = hit
+
+
+# Hashing helpers
+
+def _hash_file(path: Path, memo: dict) -> str:
+    # Content hash, memoized on (size, mtime) so unchanged files are not re-read every run
+    st = path.stat()
+    stamp = f"{st.st_size}:{st.st_mtime_ns}"
+    entry = memo.get(str(path))
+    if entry and entry["stamp"] == stamp:
+        return entry["hash"]
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    memo[str(path)] = {"stamp": stamp, "hash": h.hexdigest()}
+    return h.hexdigest()
+
+
+def _hash_code(func) -> str:
+    # func may also be a module (a stage's helper code)
+    try:
+        src = inspect.getsource(func)
+    except (OSError, TypeError):
+        src = func.__name__
+    return hashlib.blake2b(src.encode(), digest_size=16).hexdigest()
+
+
+def _hash_value(value) -> str:
+    # Stage argument that is not an Artifact: frames and arrays by content, containers
+    # element-wise, anything else by repr (a default object repr never matches, so such
+    # arguments recompute rather than reuse a stale entry)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h = hashlib.blake2b(digest_size=16)
+        dtypes = value.dtypes.to_dict() if isinstance(value, pd.DataFrame) else {value.name: value.dtype}
+        h.update(repr((type(value).__name__, value.shape, dtypes)).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        except TypeError:       # unhashable cells (lists, dicts)
+            h.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        return h.hexdigest()
+    if isinstance(value, np.ndarray):
+        return hashlib.blake2b(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), digest_size=16).hexdigest()
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{k!r}: {_hash_value(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}({', '.join(_hash_value(v) for v in value)})"
+    return repr(value)
+
+
+# Artifact storage (Arrow IPC files are memory-mapped on load)
+
+def _save(value, path: Path) -> None:
+    if isinstance(value, dict) and value and all(isinstance(v, pd.DataFrame) for v in value.values()):
+        path.mkdir()
+        for name, frame in value.items():
+            _save(frame, path / name)
+        return
+    if pa is not None and isinstance(value, pd.DataFrame):
+        try:
+            table = pa.Table.from_pandas(value)
+            with pa.OSFile(str(path.with_suffix(".arrow")), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            return
+        except (pa.ArrowException, TypeError, ValueError):
+            path.with_suffix(".arrow").unlink(missing_ok=True)
+    with open(path.with_suffix(".pkl"), "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load(path: Path):
+    if path.is_dir():
+        return {p.stem: _load(p.with_suffix("")) for p in sorted(path.iterdir())}
+    if path.with_suffix(".arrow").exists():
+        source = pa.memory_map(str(path.with_suffix(".arrow")), "r")
+        return pa.ipc.open_file(source).read_all().to_pandas()
+    with open(path.with_suffix(".pkl"), "rb") as f:
+        return pickle.load(f)
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class StageCache:
+    """On-disk cache of pipeline stage outputs.
+
+    A stage's key hashes its name, its source code (and that of any helper
+    modules listed in deps), its parameters and arguments, the
+    contents of its input files and the keys of the upstream artifacts it was
+    given, so editing one stage only recomputes that stage and what follows it.
+    Least-recently-used entries are evicted once the cache exceeds max_bytes;
+    an output larger than max_bytes on its own is not stored.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES, enabled: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._memo_path = self.cache_dir / "file_hashes.json"
+        self._memo = json.loads(self._memo_path.read_text()) if self._memo_path.exists() else {}
+
+    def key(self, func: Callable, files: Iterable[Path], params: dict, upstream: Iterable[str],
+            deps: Iterable = ()) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{CACHE_FORMAT}:{func.__module__}.{func.__qualname__}:{_hash_code(func)}".encode())
+        for d in deps:
+            h.update(f"{d.__name__}:{_hash_code(d)}".encode())
+        for p in files:
+            h.update(f"{p}:{_hash_file(Path(p), self._memo)}".encode())
+        h.update(repr(sorted(params.items())).encode())
+        for k in upstream:
+            h.update(k.encode())
+        return h.hexdigest()
+
+    def stage(self, files: Iterable = (), deps: Iterable = (), **params):
+        """Decorator turning a function into a cached stage.
+
+        Artifact arguments are unwrapped before the call and enter the key by
+        their own key; any other argument is hashed by value (DataFrames by
+        content). The decorated function returns an Artifact. Stages declared with files receive the
+        file list as their first argument. deps lists the modules the stage
+        delegates to, so editing them also invalidates the stage.
+        """
+        files = [Path(p) for p in files]
+
+        def decorator(func: Callable):
+            @wraps(func)
+            def run(*args, **kwargs) -> Artifact:
+                # every argument enters the key under its position or name ("*0" is never a keyword)
+                named = [(f"*{i}", a) for i, a in enumerate(args)] + list(kwargs.items())
+                upstream = [f"{name}={a.key}" for name, a in named if isinstance(a, Artifact)]
+                call_params = {**params, **{name: _hash_value(a) for name, a in named if not isinstance(a, Artifact)}}
+                args = [a.value if isinstance(a, Artifact) else a for a in args]
+                kwargs = {k: (v.value if isinstance(v, Artifact) else v) for k, v in kwargs.items()}
+                key = self.key(func, files, call_params, upstream, deps)
+                self._save_memo()
+
+                start = time.perf_counter()
+                value = self.get(key) if self.enabled else None
+                if value is not None:
+                    print(f"[stage] {func.__name__}: cached ({time.perf_counter() - start:.1f}s)")
+                    return Artifact(key, value, hit=True)
+                if files:
+                    value = func(files, *args, **{**params, **kwargs})
+                else:
+                    value = func(*args, **{**params, **kwargs})
+                if self.enabled and not self.put(key, value):
+                    print(f"[stage] {func.__name__}: output is larger than the whole cache "
+                          f"({self.max_bytes / 2**20:.0f} MB, OLIST_STAGE_CACHE_MB); not cached")
+                print(f"[stage] {func.__name__}: computed ({time.perf_counter() - start:.1f}s)")
+                return Artifact(key, value, hit=False)
+            return run
+        return decorator
+
+    def get(self, key: str):
+        entry = self.cache_dir / key
+        if not (entry / "done").exists():
+            return None
+        (entry / "done").touch()        # mark as recently used for eviction
+        return _load(entry / "value")
+
+    def put(self, key: str, value) -> bool:
+        # False if the value alone is over max_bytes: eviction would only delete it again
+        entry = self.cache_dir / key
+        tmp = self.cache_dir / f"{key}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        _save(value, tmp / "value")
+        if _dir_size(tmp) > self.max_bytes:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        (tmp / "done").touch()
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.rename(entry)
+        self.evict()
+        return True
+
+    def evict(self, max_bytes: Optional[int] = None) -> None:
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = [p for p in self.cache_dir.iterdir() if (p / "done").exists()]
+        sizes = {p: _dir_size(p) for p in entries}
+        total = sum(sizes.values())
+        for p in sorted(entries, key=lambda p: (p / "done").stat().st_mtime):
+            if total <= max_bytes:
+                break
+            total -= sizes[p]
+            shutil.rmtree(p, ignore_errors=True)
+
+    def write_if_changed(self, artifact: Artifact, path, write: Callable) -> None:
+        # Skip re-exporting a file that was already written from this exact artifact
+        path = Path(path)
+        stamps_path = self.cache_dir / "exports.json"
+        stamps = json.loads(stamps_path.read_text()) if stamps_path.exists() else {}
+        if path.exists() and stamps.get(str(path.resolve())) == artifact.key:
+            return
+        write(path)
+        stamps[str(path.resolve())] = artifact.key
+        stamps_path.write_text(json.dumps(stamps, indent=1))
+
+    def _save_memo(self) -> None:
+        self._memo_path.write_text(json.dumps(self._memo, indent=1))